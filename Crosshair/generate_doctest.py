@@ -12,24 +12,75 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 sys.path.append(str(Path(__file__).resolve().parent))
 
+import functools
+import os
+import shutil
+import signal
 import subprocess
+import threading
+import time
 import re
 from ast import literal_eval
 import logging
 
 logging.basicConfig(level=logging.DEBUG)  # Set logging level for detailed output
 
+# Precompiled once so repeated CrossHair runs don't re-compile the pattern
+_CALL_RE = re.compile(r"(\w+)\((.*?)\)")
+
+# Resolved once, the "Programs" folder never moves while the tool is running
+_PROGRAMS_DIR = Path(__file__).resolve().parent / "Programs"
+
+# Upper bound (seconds) on a single CrossHair run, bounds runaway symbolic execution
+_CROSSHAIR_TIMEOUT = 60
+
+def _fast_eval(value: str):
+    """
+    Parses a single CrossHair-generated argument.
+
+    CrossHair output is overwhelmingly small ints and floats, so try the direct
+    int()/float() constructors (one C call) before falling back to
+    ast.literal_eval and its full tokenize + parse pipeline.
+    """
+    value = value.strip()
+    if value[:1].isdigit() or value[:1] in "-+.":
+        try:
+            return int(value)
+        except ValueError:
+            pass
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return literal_eval(value)
+
+
+@functools.lru_cache(maxsize=1)
 def is_crosshair_installed() -> bool:
     """
     Checks if CrossHair is installed and available in the PATH.
 
+    The PATH lookup replaces spawning `crosshair --help` (a full fork + exec +
+    interpreter startup) and the result is cached for the lifetime of the process.
+
     Returns:
         True if CrossHair is installed, False otherwise.
     """
-    result = subprocess.run(["crosshair", "--help"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    return result.returncode == 0
+    return shutil.which("crosshair") is not None
+
 
 
+def _kill_process_tree(process):
+    """
+    Kills the CrossHair process and any children it spawned. Killing only the
+    direct child would leave grandchildren holding the stdout pipe open, and
+    the streaming read would stay blocked despite the kill.
+    """
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        process.kill()
+
 
 def generate_doctest_CrossHair(file_name: str):
 
@@ -40,14 +91,13 @@ def generate_doctest_CrossHair(file_name: str):
         file_name: Path to the file containing the function.
 
     Returns:
-        A list of tuples representing inputs and expected outputs.
+        A (inputs, completed) pair: a list of input tuples, and a flag that is
+        True only when CrossHair ran to completion without timing out or
+        erroring. Partial results from interrupted runs are returned with
+        completed=False so callers can use them without caching them.
     """
-    # Define the root directory of the project (e.g. "ARHF")
-    project_root = Path(__file__).parent
-    programs_folder = project_root / "Programs"
-
-    # Save the file to the "Programs" folder
-    file_path = programs_folder / file_name
+    # Save the file to the "Programs" folder (resolved at import)
+    file_path = _PROGRAMS_DIR / file_name
 
     if not is_crosshair_installed():
         logging.error("CrossHair is not installed or not in PATH.")
@@ -59,54 +109,85 @@ def generate_doctest_CrossHair(file_name: str):
         sys.exit(1)
 
     try:
-        # Run CrossHair check
-        result = subprocess.run(
+        # Run CrossHair and stream its stdout instead of buffering the whole run,
+        # each line is parsed as it arrives and the total run time is bounded
+        process = subprocess.Popen(
             ["crosshair", "cover", str(file_path)],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True
+            text=True,
+            bufsize=1,
+            start_new_session=True  # own process group, so a timeout can kill the whole tree
         )
 
-        print("Result: ", result)
+        # Drain stderr on a helper thread so a chatty CrossHair cannot fill the pipe and deadlock
+        stderr_lines = []
+        drain = threading.Thread(target=lambda: stderr_lines.extend(process.stderr), daemon=True)
+        drain.start()
 
-        # Log raw outputs
-        logging.debug(f"CrossHair stdout: {result.stdout}")
-        logging.debug(f"CrossHair stderr: {result.stderr}")
+        CrossHair_Inputs = []
+        deadline = time.monotonic() + _CROSSHAIR_TIMEOUT
+        timed_out = False
 
-        # Check if CrossHair encountered an error
-        if result.returncode != 0:
-            logging.error("CrossHair encountered an error or did not generate any matches.")
-            return []
+        # A watchdog kills the process at the deadline even when it hangs
+        # without emitting anything, in which case the stdout read below
+        # would block forever and the in-loop deadline check never runs
+        watchdog_fired = threading.Event()
 
-        # Regex to extract input and output
-        pattern = r"(\w+)\((.*?)\)"
+        def _kill_on_timeout():
+            watchdog_fired.set()
+            _kill_process_tree(process)
 
+        watchdog = threading.Timer(_CROSSHAIR_TIMEOUT, _kill_on_timeout)
+        watchdog.start()
 
-        matches = re.findall(pattern, result.stdout)
-        # Log the matches found
-        logging.debug(f"Matches found: {matches}")
+        for line in process.stdout:
+            logging.debug(f"CrossHair stdout: {line.rstrip()}")
 
-        # matches are like: [('Divide', '0, 0'), ('Divide', '0, -1')]
+            # Matches are like: [('Divide', '0, 0'), ('Divide', '0, -1')]
+            # Extract inputs and typecast them to the correct type
+            for match in _CALL_RE.findall(line):
+                inputs = match[1].split(", ")
 
-        # Extract inputs and typecast them to the correct type
+                inputs = tuple(map(_fast_eval, inputs))
 
-        CrossHair_Inputs = []
+                CrossHair_Inputs.append(inputs)
+
+            if time.monotonic() > deadline:
+                timed_out = True
+                _kill_process_tree(process)
+                logging.error("CrossHair timed out, keeping the inputs collected so far.")
+                break
+
+        try:
+            returncode = process.wait(timeout=max(deadline - time.monotonic(), 1))
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            _kill_process_tree(process)
+            process.wait()
+            logging.error("CrossHair timed out, keeping the inputs collected so far.")
 
-        for match in matches:
-            inputs = match[1].split(", ")
+        watchdog.cancel()
+        if watchdog_fired.is_set():
+            timed_out = True
+            logging.error("CrossHair timed out, keeping the inputs collected so far.")
 
-            inputs = tuple(map(literal_eval, inputs))
+        drain.join(timeout=1)
+        logging.debug(f"CrossHair stderr: {''.join(stderr_lines)}")
 
-            CrossHair_Inputs.append(inputs)
+        # Check if CrossHair encountered an error
+        if not timed_out and returncode != 0:
+            logging.error("CrossHair encountered an error or did not generate any matches.")
+            return [], False
 
         print("CrossHair Inputs: ", CrossHair_Inputs)
         print("CrossHair Inputs types: ", type(CrossHair_Inputs))
 
-        return CrossHair_Inputs
+        return CrossHair_Inputs, not timed_out
 
     except Exception as e:
         logging.error(f"Error running CrossHair: {e}")
-        return []
+        return [], False
 
 
 
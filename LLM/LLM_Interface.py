@@ -22,11 +22,15 @@ Date: 20 December 2023
 import re
 import time
 import ast
+import concurrent.futures
+import hashlib
+from collections import OrderedDict
 from pathlib import Path
 import logging
 import sys
 import math
-from huggingface_hub import InferenceClient
+import requests
+from huggingface_hub import InferenceClient, configure_http_backend
 from huggingface_hub.utils import HfHubHTTPError
 from dotenv import load_dotenv
 import os
@@ -36,6 +40,8 @@ load_dotenv()
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 sys.path.append(str(Path(__file__).resolve().parent))
 
+import _cache
+
 # Configure logging
 logging.basicConfig(
     level=logging.DEBUG,
@@ -47,8 +53,108 @@ logging.basicConfig(
 )
 
 
+def _pooled_session() -> requests.Session:
+    """
+    Builds the requests.Session huggingface_hub uses under the hood, sized so
+    concurrent speculative candidates reuse keep-alive connections instead of
+    serializing on the default pool or paying a TCP/TLS handshake each.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=16)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+configure_http_backend(backend_factory=_pooled_session)
+
 # API endpoint and headers for Hugging Face Inference
-client = InferenceClient(api_key=os.getenv("HUGGING_FACE_API_KEY"))
+# X-use-cache lets the hf-inference provider serve cached completions for repeated prompts,
+# which our retry loops (check_syntax_errors, verified_code_gen, ...) hit frequently.
+# The timeout bounds how long one stuck completion can hold a worker thread.
+client = InferenceClient(api_key=os.getenv("HUGGING_FACE_API_KEY"), headers={"X-use-cache": "true"}, timeout=60)
+
+# Precompiled regex patterns, compiling them once here avoids re-compiling (or re-hashing the
+# pattern string in re's internal cache) on every LLM response we parse.
+_FUNC_BLOCK_RE = re.compile(r"```(?:python)?\s*(def .+?)```", re.DOTALL)
+_MD_LIST_RE = re.compile(r"```(?:python)?\s*\n(\[.*?\])\s*```", re.DOTALL)
+# Quoted parts use [^"]* / [^']* character classes rather than lazy dots: a
+# lazy dot could grow past a closing quote under backtracking and swallow
+# neighbouring tuples into one bogus match, the classes make that impossible.
+# Composite alternates ("s" * n, "a" + "b") come before the plain string so
+# they are not cut short at the bare literal.
+_DOCTEST_STR_RE = re.compile(
+    r'\(\s*("[^"]*"\s*\*\s*\d+|\'[^\']*\'\s*\*\s*\d+|"[^"]*"\s*\+\s*"[^"]*"|\'[^\']*\'\s*\+\s*\'[^\']*\'|"[^"]*"|\'[^\']*\')\s*,?\s*\)'
+)
+_COMMENT_RE = re.compile(r"#.*")
+
+def _eval_literal_node(node):
+    """
+    ast.literal_eval extended with the repetition and concatenation shapes
+    LLMs like to emit inside doctest lists ('"ab" * 3', '"a" + "b"'), which
+    plain literal_eval rejects. Recurses through tuples and lists so composite
+    elements nested in a doctest tuple are handled too.
+    """
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, SyntaxError):
+        pass
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Mult)):
+        left = _eval_literal_node(node.left)
+        right = _eval_literal_node(node.right)
+        return left + right if isinstance(node.op, ast.Add) else left * right
+    if isinstance(node, ast.Tuple):
+        return tuple(_eval_literal_node(element) for element in node.elts)
+    if isinstance(node, ast.List):
+        return [_eval_literal_node(element) for element in node.elts]
+    raise ValueError("unsupported doctest element")
+
+
+def _eval_doctest_token(token: str):
+    """Evaluates one _DOCTEST_STR_RE match via the extended literal evaluator."""
+    return _eval_literal_node(ast.parse(token.strip(), mode="eval").body)
+
+# Shared pool for speculative candidate generation, the LLM calls are I/O bound
+# and release the GIL while waiting on the network.
+_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+
+# The "Programs" folder is fixed for the lifetime of the process, resolve it and
+# create it once at import so Create_File skips the per-call stat + mkdir pair.
+_PROGRAMS_DIR = Path(__file__).resolve().parent.parent / "Crosshair" / "Programs"
+_PROGRAMS_DIR.mkdir(exist_ok=True)
+
+# In-memory caches are OrderedDicts bounded to this many entries, evicting the
+# least recently used one on overflow so long batch runs cannot grow unboundedly.
+_CACHE_MAX_ENTRIES = 512
+
+
+def _lru_put(cache: OrderedDict, key, value):
+    """Inserts into a bounded LRU cache, evicting the oldest entry on overflow."""
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > _CACHE_MAX_ENTRIES:
+        cache.popitem(last=False)
+
+
+# Compiled code objects keyed by hash of the source string, verified_code_gen
+# re-executes the same candidate across rounds so the bytecode is reused.
+_COMPILED = OrderedDict()
+
+# Prototype globals for candidate execution, dict.copy() per run is a single C
+# call versus exec re-binding __builtins__ into a fresh empty dict every time.
+_PROTO_ENV = {"__builtins__": __builtins__}
+
+
+def _compile_function_code(function_code: str):
+    """Returns a cached code object for function_code, compiling it on first use."""
+    h = hash(function_code)
+    code = _COMPILED.get(h)
+    if code is None:
+        code = compile(function_code, "<llm>", "exec")
+        _lru_put(_COMPILED, h, code)
+    else:
+        _COMPILED.move_to_end(h)
+    return code
 
 
 # Sample function details dictionary
@@ -68,7 +174,28 @@ client = InferenceClient(api_key=os.getenv("HUGGING_FACE_API_KEY"))
   "return_1": "int"
 }'''
 
-def make_request_with_retries(client, model, messages, retries=1, delay=0.5):
+def _function_block_complete(buffer: str) -> bool:
+    """Returns True once the buffer holds a closed markdown code block."""
+    first = buffer.find("```")
+    return first != -1 and buffer.find("```", first + 3) != -1
+
+
+def _list_complete(buffer: str) -> bool:
+    """Returns True once the buffer holds a balanced top-level [...] list."""
+    depth = 0
+    started = False
+    for char in buffer:
+        if char == "[":
+            depth += 1
+            started = True
+        elif char == "]":
+            depth -= 1
+            if started and depth == 0:
+                return True
+    return False
+
+
+def make_request_with_retries(client, model, messages, retries=1, delay=0.5, use_cache=True, stop=None, n=1, seed=None):
     """
     Makes an API request to Hugging Face with retries for transient errors.
 
@@ -78,25 +205,82 @@ def make_request_with_retries(client, model, messages, retries=1, delay=0.5):
         messages: The messages to send to the model.
         retries: Number of retries.
         delay: Delay between retries in seconds.
+        use_cache: Whether the provider may answer from its prompt cache. Pass
+            False on resampling call sites (reprompts, speculative attempts),
+            where a cached answer would just replay the completion that already
+            failed; the local cache is bypassed for those requests too.
+        stop: Optional predicate on the accumulated response text. When given, the
+            response is streamed and the connection is closed as soon as the predicate
+            matches, so we never wait for tokens past the part we parse. Only valid
+            for single completions (n=1).
+        n: Number of completions to request in the single round-trip.
+        seed: Optional sampling seed, used to keep otherwise-identical
+            concurrent attempts from collapsing into one completion.
 
     Returns:
         The response object or None if all retries fail.
     """
+    extra_body = {"use_cache": use_cache}
+    if seed is not None:
+        extra_body["seed"] = seed
+
+    # Exact-match local cache: identical (model, messages) pairs skip the network
+    # entirely. Multi-completion responses are not cached since the cache stores a
+    # single choice, and resampling requests must not be answered (or poisoned)
+    # by an earlier completion for the same prompt.
+    cacheable = use_cache and n == 1 and seed is None
+    key = _cache.make_key(model, messages)
+    if cacheable:
+        cached = _cache.get(key)
+        if cached is not None:
+            logging.info("LLM response served from local cache.")
+            return {"choices": [{"message": {"content": cached}}]}
+
     for attempt in range(1, retries + 1):
         try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=messages
-           )
+            if stop is not None:
+                stream = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    extra_body=extra_body,
+                    stream=True
+               )
+                buffer = ""
+                for chunk in stream:
+                    try:
+                        delta = chunk['choices'][0]['delta']['content']
+                    except (KeyError, IndexError, TypeError):
+                        delta = None
+                    if delta:
+                        buffer += delta
+                        if stop(buffer):
+                            stream.close()  # we have everything we parse, drop the tail
+                            break
+                response = {"choices": [{"message": {"content": buffer}}]} if buffer else None
+            else:
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    extra_body=extra_body,
+                    n=n
+               )
             if response is not None:
                 logging.info(f"API request successful on attempt {attempt}.")
+                if cacheable:
+                    try:
+                        _cache.put(key, response['choices'][0]['message']['content'])
+                    except Exception:
+                        pass  # a malformed response is still returned, just not cached
                 return response
             else:
                 logging.warning(f"Attempt {attempt}: Response is None. Retrying...")
 
-        except HfHubHTTPError as e:  
+        except HfHubHTTPError as e:
             logging.error(f"API request failed on attempt {attempt}: {str(e)}")
-        
+
+        # No point backing off after the last attempt, it would just delay the failure return
+        if attempt == retries:
+            break
         time.sleep(delay * attempt)
 
     logging.error("All retry attempts failed.")
@@ -124,9 +308,15 @@ def validate_api_response(response, expected_keys):
 
     return True
 
+# Memo for extract_function_code, identical completions repeat verbatim once
+# response caching is on, so the whole extraction pipeline is skipped on repeats.
+_EXTRACT_CACHE = OrderedDict()
+
+
 def extract_function_code(response_text):
     """
-    Extracts the function code from the response text.
+    Extracts the function code from the response text, memoized on a hash of the
+    full text (None results are cached too, extraction failures also repeat).
 
     Args:
         response_text: The raw response text from the API.
@@ -134,7 +324,17 @@ def extract_function_code(response_text):
     Returns:
         The extracted function code or None if extraction fails.
     """
-    match = re.search(r"```(?:python)?\s*(def .+?)```", response_text, re.DOTALL)
+    key = hashlib.sha1(response_text.encode()).digest()
+    if key in _EXTRACT_CACHE:
+        _EXTRACT_CACHE.move_to_end(key)
+        return _EXTRACT_CACHE[key]
+    result = _extract_function_code(response_text)
+    _lru_put(_EXTRACT_CACHE, key, result)
+    return result
+
+
+def _extract_function_code(response_text):
+    match = _FUNC_BLOCK_RE.search(response_text)
     if match:
         return match.group(1).strip()
     
@@ -158,10 +358,86 @@ def extract_function_code(response_text):
     logging.warning("Fallback extraction used.")
     return response_text.strip()
 
-def generate_llm_doctests(function_signature: str, docstring: str) -> list:
+def _doctests_from_ast(text: str) -> list:
+    """
+    Extracts doctest inputs by parsing the text as a Python expression and walking
+    the top-level list, salvaging whichever elements are valid literals. This is a
+    deterministic O(n) pass, unlike the regex fallback which can backtrack heavily
+    on malformed LLM output. Returns [] when the text is not a list expression.
+    """
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except (SyntaxError, ValueError):
+        return []
+
+    if not isinstance(tree.body, ast.List):
+        return []
+
+    doctests = []
+    for element in tree.body.elts:
+        try:
+            doctests.append(_eval_literal_node(element))
+        except (ValueError, SyntaxError):
+            continue
+    return doctests
+
+
+def _parse_doctest_content(doctest_content: str) -> list:
+    """
+    Parses one completion's content into a list of doctest inputs, trying the
+    bracket slice, literal_eval, the AST walk and finally the regex fallbacks.
+    Returns [] when nothing usable can be extracted.
+    """
+    # Try to extract directly from brackets
+    first_bracket = doctest_content.find("[")
+    last_bracket = doctest_content.rfind("]")
+
+    if first_bracket != -1 and last_bracket != -1:
+        doctest_content = doctest_content[first_bracket:last_bracket + 1]
+    else:
+        # Try markdown block fallback
+        matches = _MD_LIST_RE.findall(doctest_content)
+        if matches:
+            doctest_content = matches[0]
+
+    # Attempt to parse with ast.literal_eval
+    try:
+        doctest_inputs = ast.literal_eval(doctest_content)
+        if isinstance(doctest_inputs, list) and doctest_inputs:
+            return doctest_inputs
+    except Exception:
+        pass  # fallback below
+
+    # Fallback: walk the AST of the list expression and salvage the valid literals
+    doctests = _doctests_from_ast(doctest_content)
+
+    if doctests == []:
+        # Last resort: regex-based extraction for content that does not parse at all
+        matches = _DOCTEST_STR_RE.findall(doctest_content)
+
+        for m in matches:
+            try:
+                value = _eval_doctest_token(m)  # plain literal, repetition or concatenation
+                doctests.append((value,))
+            except (ValueError, SyntaxError):
+                continue
+
+    if doctests == []:
+        doctests = parse_doctest_inputs(doctest_content)
+
+    doctests = normalize_doctests(doctests)
+
+    return doctests if doctests else []
+
+
+def generate_llm_doctests(function_signature: str, docstring: str, variants: int = 1) -> list:
     """
     Generates a list of Python doctests for the function using the Hugging Face API.
 
+    When variants > 1, a single batched request asks the model for that many
+    independent completions (one round-trip instead of N) and the parsed inputs
+    are merged and deduplicated.
+
     Returns:
         The a list containing doctest input tuples, returns [] on syntax error or failure.
     """
@@ -190,60 +466,34 @@ def generate_llm_doctests(function_signature: str, docstring: str) -> list:
         }
     ]
 
-    response = make_request_with_retries(client, "Qwen/Qwen2.5-Coder-32B-Instruct", messages)
+    # Streaming early-stop only makes sense for a single completion
+    response = make_request_with_retries(
+        client, "Qwen/Qwen2.5-Coder-32B-Instruct", messages,
+        stop=_list_complete if variants == 1 else None,
+        n=variants
+    )
 
     if response and validate_api_response(response, ["choices"]):
-        doctest_content = response['choices'][0]['message']['content']
-        print("RESPONSE DOCTESTS:\n", doctest_content)
-
-        # Try to extract directly from brackets
-        first_bracket = doctest_content.find("[")
-        last_bracket = doctest_content.rfind("]")
-
-        if first_bracket != -1 and last_bracket != -1:
-            doctest_content = doctest_content[first_bracket:last_bracket + 1]
-        else:
-            # Try markdown block fallback
-            matches = re.findall(r"```(?:python)?\s*\n(\[.*?\])\s*```", doctest_content, re.DOTALL)
-            if matches:
-                doctest_content = matches[0]
-
-        # Attempt to parse with ast.literal_eval
-        try:
-            doctest_inputs = ast.literal_eval(doctest_content)
-            if isinstance(doctest_inputs, list) and doctest_inputs:
-                return doctest_inputs
-        except Exception:
-            pass  # fallback below
-
-        # Fallback: regex-based extraction
-        matches = re.findall(
-            r'\(\s*(".*?"|\'.*?\'|".*?"\s*\*\s*\d+|\'.*?\'\s*\*\s*\d+|".*?"\s*\+\s*".*?"|\'.*?\'\s*\+\s*\'.*?\')\s*,?\s*\)',
-            doctest_content,
-            re.DOTALL,
-        )
-
         doctests = []
-        for m in matches:
-            try:
-                value = eval(m)  # Controlled eval for quoted strings
-                doctests.append((value,))
-            except Exception:
-                continue
-
-        if doctests == []:
-            doctests = parse_doctest_inputs(doctest_content)
-
-        doctests = normalize_doctests(doctests)
-
-        return doctests if doctests else []
+        seen = set()
+        for choice in response['choices']:
+            doctest_content = choice['message']['content']
+            print("RESPONSE DOCTESTS:\n", doctest_content)
+            for doctest in _parse_doctest_content(doctest_content):
+                marker = repr(doctest)
+                if marker not in seen:
+                    seen.add(marker)
+                    doctests.append(doctest)
+        return doctests
 
     return []
 
 
-def generate_function_code(function_signature, docstring, doctests=[]) -> str:
+def generate_function_code(function_signature, docstring, doctests=[], seed=None) -> str:
     """
-    Generates the Python function code with the given function_details dictonary using the Hugging Face API, and 
+    Generates the Python function code with the given function_details dictonary using the Hugging Face API, and
+    Speculative callers pass distinct seeds so their concurrent attempts sample different completions instead of
+    being collapsed into one by the provider or local cache.
     """
     messages = [
         {
@@ -264,7 +514,7 @@ def generate_function_code(function_signature, docstring, doctests=[]) -> str:
         }
     ]
 
-    response = make_request_with_retries(client, "Qwen/Qwen2.5-Coder-32B-Instruct", messages)
+    response = make_request_with_retries(client, "Qwen/Qwen2.5-Coder-32B-Instruct", messages, stop=_function_block_complete, use_cache=seed is None, seed=seed)
     if response and validate_api_response(response, ["choices"]):
         function_content = response['choices'][0]['message']['content']
         return extract_function_code(function_content)
@@ -272,29 +522,53 @@ def generate_function_code(function_signature, docstring, doctests=[]) -> str:
     return None
 
 
+# Success-only memo tables for the two verification entry points. main.py calls
+# them again after every regeneration with inputs that often repeat (same form
+# details, same session doctests), so a hit skips the whole LLM round-trip.
+_SYNTAX_CACHE = OrderedDict()
+_VERIFIED_CACHE = OrderedDict()
+
+
+def _memo_key(*parts: str) -> bytes:
+    """Digests the given strings into a compact key for the memo tables above."""
+    return hashlib.blake2b("\x00".join(parts).encode(), digest_size=16).digest()
+
+
 def check_syntax_errors(function_signature, docstring, doctests):
-    """ 
-    It runs the function generate_function_code repeatedly for 3 times. Returns a string containing the syntax error free code for the function,
-    under the condition that user has provided meaningful details. Else, returns None.
     """
-    namespace = {}
-    i = 0
-    while i < 3:
+    It launches 3 speculative calls to generate_function_code concurrently and returns a string containing the syntax error free code for
+    the function from the first call that produces one, under the condition that user has provided meaningful details. Else, returns None.
+    Successful results are memoized per (signature, docstring, doctests), so resubmitting the same details skips the generation round.
+    """
+    key = _memo_key(function_signature, docstring, repr(doctests))
+    cached = _SYNTAX_CACHE.get(key)
+    if cached is not None:
+        _SYNTAX_CACHE.move_to_end(key)
+        return cached
+    # Distinct seeds keep the three attempts from collapsing into one cached completion
+    futures = [_POOL.submit(generate_function_code, function_signature, docstring, doctests, seed) for seed in range(3)]
+    result = None
+    for future in concurrent.futures.as_completed(futures):
         try:
-            new_response = generate_function_code(function_signature, docstring, doctests)
-            exec(new_response, namespace)
-            return new_response
+            new_response = future.result()
+            ast.parse(new_response)  # pure syntax validation, nothing gets executed
+            result = new_response
+            break
         except Exception as e:
-            logging.error(f"Error during execution: {e}")
-            i += 1
-            continue
-    logging.error("Failed to generate valid function code after 5 attempts.")
-    return None
+            logging.error(f"Error during validation: {e}")
+    for future in futures:
+        future.cancel()
+    if result is None:
+        logging.error("Failed to generate valid function code after 3 attempts.")
+    else:
+        _lru_put(_SYNTAX_CACHE, key, result)
+    return result
 
 
-def refute_code(function_code, doctests=[]) -> str:
+def refute_code(function_code, doctests=[], seed=None) -> str:
     """
-    Generates the Python function code with the given function_details dictonary using the Hugging Face API, and 
+    Generates the Python function code with the given function_details dictonary using the Hugging Face API, and
+    Speculative callers pass distinct seeds so their concurrent attempts sample different completions.
     """
     messages = [
         {
@@ -312,7 +586,7 @@ def refute_code(function_code, doctests=[]) -> str:
         }
     ]
 
-    response = make_request_with_retries(client, "Qwen/Qwen2.5-Coder-32B-Instruct", messages)
+    response = make_request_with_retries(client, "Qwen/Qwen2.5-Coder-32B-Instruct", messages, stop=_function_block_complete, use_cache=seed is None, seed=seed)
     if response and validate_api_response(response, ["choices"]):
         function_content = response['choices'][0]['message']['content']
         return extract_function_code(function_content)
@@ -321,23 +595,45 @@ def refute_code(function_code, doctests=[]) -> str:
 
 
 def refute_code_errors(function_code, doctests):
-    """ 
-    It runs the function generate_function_code repeatedly for 3 times. Returns a string containing the syntax error free code for the function,
-    under the condition that user has provided meaningful details. Else, returns None.
     """
-    namespace = {}
-    i = 0
-    while i < 3:
+    It launches 3 speculative calls to refute_code concurrently and returns a string containing the syntax error free code for the function
+    from the first call that produces one, under the condition that user has provided meaningful details. Else, returns None.
+    """
+    # Distinct seeds keep the three attempts from collapsing into one cached completion
+    futures = [_POOL.submit(refute_code, function_code, doctests, seed) for seed in range(3)]
+    result = None
+    for future in concurrent.futures.as_completed(futures):
         try:
-            new_response = refute_code(function_code, doctests)
-            exec(new_response, namespace)
-            return new_response
+            new_response = future.result()
+            ast.parse(new_response)  # pure syntax validation, nothing gets executed
+            result = new_response
+            break
         except Exception as e:
-            logging.error(f"Error during execution: {e}")
-            i += 1
-            continue
-    logging.error("Failed to generate valid function code after 5 attempts.")
-    return None
+            logging.error(f"Error during validation: {e}")
+    for future in futures:
+        future.cancel()
+    if result is None:
+        logging.error("Failed to generate valid function code after 3 attempts.")
+    return result
+
+
+# Static chunks of the reprompt prompt, rendered once at import so each retry
+# round in verified_code_gen only concatenates the three values that change.
+_REPROMPT_PRE = "The incorrect function code (in python) is as follows:\n\n"
+_REPROMPT_FAILED = "\n\nCurrent function code fails the doctests: "
+_REPROMPT_DOCTESTS = "\nModify this function code to satisfy these doctests: "
+_REPROMPT_TAIL = (
+    ", every doctest is a tuple (input, output).\n"
+    "To modify this function, try to find patterns in doctests, and reverse engineer to generate the function code so that the code passes all doctests.\n"
+    "The failures are due to incorrect assumptions or logic in the code. Correct those assumptions with the help of doctests.\n"
+    "The docstring is ambigious, do not rely on it. You should only trust the doctests\n"
+    "DO NOT RETURN NONE, try to find out the variable or expression which explains the desired output and then use that to reverse engineer.\n"
+    "The doctests have many edge cases covered, while the code does not cover them.\n"
+    "Carefully go through the doctests (don't modify them) and revise the function code to pass all these doctests and give the corrected code in the same format.\n"
+    "Your response should only contain the function code in the specified format. \n"
+    "Some edge cases are reflected in only a single doctests, so don't ignore them.\n"
+    "Incase you are not able to generate the code, explain the reason for failiure"
+)
 
 
 def repromt_llm(function_code: str, doctests: list, failed_doctests: list) -> str:
@@ -350,24 +646,18 @@ def repromt_llm(function_code: str, doctests: list, failed_doctests: list) -> st
         {
             "role": "user",
             "content": (
-                "The incorrect function code (in python) is as follows:\n\n"
-                f"{function_code}\n\n"
-                f"Current function code fails the doctests: {failed_doctests}\n"
-                f"Modify this function code to satisfy these doctests: {doctests}, every doctest is a tuple (input, output).\n"
-                "To modify this function, try to find patterns in doctests, and reverse engineer to generate the function code so that the code passes all doctests.\n"
-                "The failures are due to incorrect assumptions or logic in the code. Correct those assumptions with the help of doctests.\n"
-                "The docstring is ambigious, do not rely on it. You should only trust the doctests\n"
-                "DO NOT RETURN NONE, try to find out the variable or expression which explains the desired output and then use that to reverse engineer.\n"
-                "The doctests have many edge cases covered, while the code does not cover them.\n"
-                "Carefully go through the doctests (don't modify them) and revise the function code to pass all these doctests and give the corrected code in the same format.\n"
-                "Your response should only contain the function code in the specified format. \n"
-                "Some edge cases are reflected in only a single doctests, so don't ignore them.\n"
-                "Incase you are not able to generate the code, explain the reason for failiure"
+                _REPROMPT_PRE + function_code
+                + _REPROMPT_FAILED + str(failed_doctests)
+                + _REPROMPT_DOCTESTS + str(doctests)
+                + _REPROMPT_TAIL
             )
         }
     ]
 
-    response = make_request_with_retries(client, "Qwen/Qwen2.5-Coder-32B-Instruct", messages)
+    # Never answer a reprompt from cache: when a round regenerates the same
+    # failing code, the next round's prompt is byte-identical and a cached
+    # reply would just replay the bad completion instead of resampling
+    response = make_request_with_retries(client, "Qwen/Qwen2.5-Coder-32B-Instruct", messages, stop=_function_block_complete, use_cache=False)
     print("RESPONSE:\n", response)
     if response and validate_api_response(response, ["choices"]):
         function_content = response['choices'][0]['message']['content']
@@ -403,10 +693,10 @@ def refute_llm_code(function_code: str, doctests: list) -> str:
         }
     ]
 
-    response = make_request_with_retries(client, "Qwen/Qwen2.5-Coder-32B-Instruct", messages)
+    response = make_request_with_retries(client, "Qwen/Qwen2.5-Coder-32B-Instruct", messages, stop=_list_complete)
     if response and validate_api_response(response, ["choices"]):
         doctest_content = response['choices'][0]['message']['content']
-        
+
         first_bracket = doctest_content.find("[")
         last_bracket = doctest_content.rfind("]")
         
@@ -426,17 +716,9 @@ def refute_llm_code(function_code: str, doctests: list) -> str:
     return []
 
 def Create_File(function_name, function_code):
-    # Define the root directory of the project (e.g., "ARHF")
-    project_root = Path(__file__).parent  # Adjust this to your project root if needed
-    project_root_root = project_root.parent
-    programs_folder = project_root_root / "Crosshair" / "Programs"
-
-    # Ensure the "Programs" folder exists
-    programs_folder.mkdir(exist_ok=True)
-
-    # Save the file to the "Programs" folder
+    # Save the file to the "Programs" folder (resolved and created at import)
     file_name = f"{function_name}.py"
-    file_path = programs_folder / file_name
+    file_path = _PROGRAMS_DIR / file_name
 
     # Create the file if it doesn't exist
     if not file_path.exists():
@@ -451,38 +733,32 @@ def Create_File(function_name, function_code):
     return file_name
 
 
-def test(function_name: str, function_code: str, doctests: list) -> bool:
+def test(function_name: str, function_code: str, doctests: list, max_failures=None) -> bool:
     """
     Assuming function_code contains a valid syntax error free callable python function code, it returns a list failed_doctests, containing doctests
-    that the function failed.
+    that the function failed. When max_failures is given, testing stops as soon as that many failures are seen, useful when the caller only
+    needs to know that a candidate is bad rather than exactly how bad.
     """
     if doctests == []:
         return [], []
-    local_env = {}
-    exec(function_code, local_env)
+    local_env = _PROTO_ENV.copy()
+    exec(_compile_function_code(function_code), local_env)
     func = local_env.get(function_name)
     failed_doctests = [] #contains failed doctest tuples with user expected outputs
     failed_doctests_results = [] #contains failed doctest tuples with outputs given by function
-    if not isinstance(doctests[0][0], tuple): #assuming the inputs are either tuples or non-tuples
-        for doctest in doctests:
-            try:
-                output = func(doctest[0])
-                if output != doctest[1]:
-                    failed_doctests.append(doctest)
-                    failed_doctests_results.append((doctest[0], output))
-            except Exception:
-                failed_doctests.append(doctest)
-                failed_doctests_results.append((doctest[0], "Error"))
-    else:
-        for doctest in doctests:
-            try:
-                output = func(*doctest[0])
-                if output != doctest[1]:
-                    failed_doctests.append(doctest)
-                    failed_doctests_results.append((doctest[0], output))
-            except Exception:
+    tuple_mode = isinstance(doctests[0][0], tuple) #assuming the inputs are either tuples or non-tuples
+    for doctest in doctests:
+        args = doctest[0] if tuple_mode else (doctest[0],)
+        try:
+            output = func(*args)
+            if output != doctest[1]:
                 failed_doctests.append(doctest)
-                failed_doctests_results.append((doctest[0], "Error"))
+                failed_doctests_results.append((doctest[0], output))
+        except Exception:
+            failed_doctests.append(doctest)
+            failed_doctests_results.append((doctest[0], "Error"))
+        if max_failures is not None and len(failed_doctests) >= max_failures:
+            break
     return failed_doctests, failed_doctests_results
 
 
@@ -492,14 +768,26 @@ def verified_code_gen(function_name: str, function_code: str, doctests: list) ->
     And it checks if the function code passes all the doctests in the doctests list using the test function, if at least one doctest is failed,
     function code is generated again using reprompt_llm, and this goes on for atmax 5 times. If llm is not able to generate a code with passes 
     all the doctests, it returns None.
+    Verified (code, doctests) pairs are memoized, so re-verifying code that already passed is free.
     """
 
+    key = _memo_key(function_name, function_code, repr(doctests))
+    cached = _VERIFIED_CACHE.get(key)
+    if cached is not None:
+        _VERIFIED_CACHE.move_to_end(key)
+        return cached
+
     function_passAccuracy = {}
 
     i = 0
     while i < 5:
+        # Every round runs the full scan: the failure counts feed the
+        # best-candidate ranking on the error page and the reprompt should see
+        # every failing doctest, so truncated results are not usable here (and
+        # the scan is trivial next to the LLM round-trip it sits beside)
         failed_doctests = test(function_name, function_code, doctests)[0]
         if len(failed_doctests) == 0:
+            _lru_put(_VERIFIED_CACHE, key, function_code)
             return function_code
         function_passAccuracy[function_code] = len(failed_doctests)
         i += 1
@@ -520,8 +808,20 @@ def parse_doctest_inputs(text: str):
     - float("inf"), float("nan")
     - complex(real, imag)
     """
-    # Strip comments
-    cleaned = re.sub(r"#.*", "", text)
+    # Most LLM outputs are clean literals without comments, try them as-is first
+    try:
+        return ast.literal_eval(text)
+    except Exception:
+        pass
+
+    # Strip comments, but only when any are present
+    cleaned = _COMMENT_RE.sub("", text) if "#" in text else text
+
+    # Try literal_eval on the cleaned text
+    try:
+        return ast.literal_eval(cleaned)
+    except Exception:
+        pass
 
     # Define safe evaluation environment
     safe_env = {
@@ -534,12 +834,6 @@ def parse_doctest_inputs(text: str):
         "complex": complex,
     }
 
-    # Try literal_eval
-    try:
-        return ast.literal_eval(cleaned)
-    except Exception:
-        pass
-
     # Fall back to restricted eval
     try:
         return eval(cleaned, safe_env, {})
@@ -548,10 +842,5 @@ def parse_doctest_inputs(text: str):
 
 
 def normalize_doctests(doctests):
-    normalized = []
-    for d in doctests:
-        if isinstance(d, tuple) and len(d) == 1:
-            normalized.append(d[0])   # Unwrap single-element tuple
-        else:
-            normalized.append(d)
-    return normalized
+    # Unwrap single-element tuples, a comprehension keeps the loop at C speed
+    return [d[0] if isinstance(d, tuple) and len(d) == 1 else d for d in doctests]
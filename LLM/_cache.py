@@ -0,0 +1,106 @@
+"""
+Module Name: LLM Response Cache
+Purpose:
+This module provides a small exact-match cache for LLM responses. Every prompt
+we send is a pure function of (model, messages), so identical requests (common
+inside the retry loops of check_syntax_errors/verified_code_gen, and when users
+resubmit the same function details) can be answered locally without another
+network round-trip.
+
+Entries live in Redis when REDIS_URL is configured (shared across workers and
+expiring via TTL), otherwise in a local SQLite file so the tool keeps working
+as a single process with no extra services.
+
+Date: 30 August 2026
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# The cache lives in the project root so it survives across runs
+_DB_PATH = Path(__file__).resolve().parent.parent / "llm_cache.sqlite"
+
+# Entries older than this are evicted when a connection is opened, bounding
+# how much the on-disk cache can accumulate across long runs
+_MAX_AGE_SECONDS = 7 * 86400
+
+# SQLite connections cannot be shared between threads, so keep one per thread
+_local = threading.local()
+
+# Redis backend, used for every get/put when available
+_redis = None
+if redis is not None and os.environ.get("REDIS_URL"):
+    try:
+        _redis = redis.Redis.from_url(os.environ["REDIS_URL"])
+    except Exception:
+        _redis = None
+
+
+def _connection():
+    """Returns a per-thread SQLite connection, creating the table on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(_DB_PATH)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (hash TEXT PRIMARY KEY, response TEXT, ts INTEGER)"
+        )
+        conn.execute(
+            "DELETE FROM cache WHERE ts < ?", (int(time.time()) - _MAX_AGE_SECONDS,)
+        )
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def make_key(model: str, messages: list) -> str:
+    """Returns a stable hash identifying a (model, messages) request."""
+    payload = model + json.dumps(messages, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get(key: str):
+    """Returns the cached response content for key, or None on a miss."""
+    if _redis is not None:
+        try:
+            value = _redis.get("llm:" + key)
+        except redis.RedisError:
+            return None
+        return value.decode() if value is not None else None
+
+    try:
+        row = _connection().execute(
+            "SELECT response FROM cache WHERE hash = ?", (key,)
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def put(key: str, content: str) -> None:
+    """Stores the response content for key, silently ignoring storage errors."""
+    if _redis is not None:
+        try:
+            _redis.setex("llm:" + key, _MAX_AGE_SECONDS, content)
+        except redis.RedisError:
+            pass
+        return
+
+    try:
+        conn = _connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (hash, response, ts) VALUES (?, ?, ?)",
+            (key, content, int(time.time())),
+        )
+        conn.commit()
+    except sqlite3.Error:
+        pass
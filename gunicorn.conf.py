@@ -0,0 +1,24 @@
+"""
+Module Name: Gunicorn Configuration
+Purpose:
+This module configures the production WSGI server for the ARHF tool. The
+Werkzeug dev server handles one request at a time, which is unusable when each
+request spends seconds waiting on LLM calls and CrossHair runs. Threaded
+workers let many such I/O-bound requests wait concurrently.
+
+Run the tool with: gunicorn -c gunicorn.conf.py main:UI
+
+Date: 30 August 2026
+"""
+
+# The workload is I/O bound (LLM network calls, CrossHair subprocesses), so
+# threads give all the concurrency we need. A single worker process is
+# required: the background task registry (processes/tasks.py) lives in process
+# memory, and with several workers the status polls for a task would usually
+# land on a worker that never heard of it.
+workers = 1
+worker_class = 'gthread'
+threads = 32
+
+# Generation pipelines can legitimately run for a while, don't kill them early
+timeout = 120
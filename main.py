@@ -22,22 +22,85 @@ Date: 20 December 2024
 
 import sys
 import os
-from flask import Flask, render_template, request, session
+import ast
+import asyncio
+import hashlib
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, make_response, render_template, request, session
+from flask_session import Session
 
 # Add the root directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import necessary functions
 from Crosshair.generate_doctest import generate_doctest_CrossHair
+from LLM import _cache as llm_cache
 from LLM.LLM_Interface import generate_llm_doctests, Create_File, check_syntax_errors, verified_code_gen, refute_llm_code, refute_code_errors
-from processes.function_parser import function_signature_generator, user_doctests_generator, user_refute_doctests_generator
+from processes.function_parser import function_signature_generator, user_doctests_generator, user_refute_doctests_generator, validate
 from processes.doctests import suggested_doctest_inputs_generator, refuted_doctest_inputs_generator, suggested_doctests_list_generator, final_doctests_generator, final_doctests
+from processes import tasks
 
 UI = Flask(__name__)
 
+# Pool for overlapping independent generation steps, both the LLM call (network)
+# and CrossHair (subprocess) release the GIL while they wait.
+pool = ThreadPoolExecutor(max_workers=4)
+
 # Remember to set the secret key for session management in your .env file, take a look at .env.example
 UI.secret_key = os.environ.get('FLASK_SECRET_KEY', 'default_secret_key')
 
+# Server-side sessions: the function code and doctest lists we store easily grow
+# past the 4KB signed-cookie limit and were re-serialized and HMACed into every
+# response. Only a session id travels in the cookie now; payloads live in Redis
+# when REDIS_URL is configured, otherwise in files under flask_session/.
+if os.environ.get('REDIS_URL'):
+    import redis
+    UI.config.update(SESSION_TYPE = 'redis', SESSION_REDIS = redis.Redis.from_url(os.environ['REDIS_URL']))
+else:
+    UI.config.update(SESSION_TYPE = 'filesystem', SESSION_FILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'flask_session'))
+Session(UI)
+
+
+class _PickleSessionSerializer:
+    """
+    Tuple-preserving session codec for the Redis backend. Flask-Session's
+    default msgpack serializer decodes every tuple as a list, which breaks the
+    isinstance(..., tuple) dispatch on the doctest inputs we keep in session,
+    and msgpack cannot represent the tuple/list distinction at all. The
+    session data is generated server-side (never attacker-controlled bytes),
+    so pickle is safe here and round-trips every value exactly. The filesystem
+    backend already pickles through cachelib and ignores this serializer.
+    """
+
+    def encode(self, session) -> bytes:
+        return pickle.dumps(dict(session), protocol=pickle.HIGHEST_PROTOCOL)
+
+    def decode(self, serialized_data: bytes) -> dict:
+        return pickle.loads(serialized_data)
+
+
+if os.environ.get('REDIS_URL'):
+    UI.session_interface.serializer = _PickleSessionSerializer()
+
+
+def _function_code_response(template_name, function_code):
+    """
+    Renders one of the function-code result pages with a strong ETag derived
+    from the code. The pages are deterministic in function_code and browsers
+    revisit them repeatedly during refute iterations, so a matching
+    If-None-Match turns into a 304 with no template render at all.
+    """
+    etag = hashlib.sha256(function_code.encode()).hexdigest()
+    # The check runs before the render so a hit skips the template entirely
+    if request.if_none_match.contains(etag):
+        return '', 304
+    response = make_response(render_template(template_name, function_code = function_code))
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = 0
+    return response
+
 # We have added print statements at various stages to help with debugging and understanding the flow of data.
 
 # Loads the home page
@@ -45,11 +108,13 @@ UI.secret_key = os.environ.get('FLASK_SECRET_KEY', 'default_secret_key')
 def UI_for_AI():
     return render_template('home.html')
 
-@UI.route("/suggestedDoctests", methods=["POST"])
-def show_suggested_doctests():
-    # User provided details for the function stored in function_details, sample dictionary in format/functionDetailsType.txt
-    function_details = dict(request.form)
-
+def suggested_doctests_pipeline(function_details):
+    """
+    Runs the full generation pipeline (code generation, verification, LLM and
+    CrossHair doctests) for the given function details and returns a payload
+    dictionary, with an "error_message" key on failure. It executes on a worker
+    thread, so it must not touch request or session state.
+    """
     # Storing all necessary information inside variables
     function_name = function_details["function_name"]
     docstring = function_details["docstring"]
@@ -61,64 +126,143 @@ def show_suggested_doctests():
     return_type = function_details["return_1"]
 
     # Generating first instance of function code (may contain ambiguities which resolved by our tool later)
+    tasks.report("Generating your function code")
     function_code = check_syntax_errors(function_signature, docstring, user_doctests)
 
     print("function_code:", function_code)
 
-    # Send the user to error page if LLM was unable to generate function code with the given details, or other issues such as credit limitations etc.
+    # Report failure if LLM was unable to generate function code with the given details, or other issues such as credit limitations etc.
     if not function_code:
-        return render_template('errorGeneratingFunctionCode.html', error_message = "Seems you provided incorrect details or the LLM crashed")
+        return {"error_message": "Seems you provided incorrect details or the LLM crashed"}
 
     # Regenerating function code if it fails any of the doctests provided by user
+    tasks.report("Verifying the code against your doctests")
     function_code = verified_code_gen(function_name, function_code, user_doctests)
 
     # The second level of error handling when LLM generated code is unable to pass all the user provided doctests
     if isinstance(function_code, dict):
-        return render_template('errorGeneratingFunctionCode.html', error_message = "Seems llm generated code didn't pass all the doctests, or it crashed.")
+        return {"error_message": "Seems llm generated code didn't pass all the doctests, or it crashed."}
 
     # Function code generation is done, that is syntax error free and passes all the user doctests
 
-    # Suggested doctests generation
-    file_name = Create_File(function_name, function_code) #for generation of ghostwriter and crosshair doctests
+    tasks.report("Generating suggested doctests with the LLM and CrossHair")
+    # CrossHair output depends only on the function code, so its results are
+    # cached by content hash: refute cycles and resubmissions of the same code
+    # skip the whole subprocess (and the temp file it would analyse)
+    crosshair_key = "ch:" + hashlib.sha256(function_code.encode()).hexdigest()
+    cached_crosshair = llm_cache.get(crosshair_key)
+
+    # LLM and CrossHair doctest generation are independent, run them concurrently
+    # so this step costs max(LLM, CrossHair) instead of their sum. Two doctest
+    # variants come back in the one batched request and are merged/deduplicated,
+    # broader edge-case coverage for a single round-trip
+    future_llm = pool.submit(generate_llm_doctests, function_signature, docstring, 2)
+    if cached_crosshair is None:
+        # Suggested doctests generation
+        file_name = Create_File(function_name, function_code) #for generation of ghostwriter and crosshair doctests
+        future_crosshair = pool.submit(generate_doctest_CrossHair, file_name)
 
     # LLM doctests generation
-    llm_doctests = generate_llm_doctests(function_signature, docstring)
+    llm_doctests = future_llm.result()
     print("llm doctests:", llm_doctests)
 
     # Crosshair doctests generation
-    Doctests_CrossHair = generate_doctest_CrossHair(file_name)
+    if cached_crosshair is None:
+        Doctests_CrossHair, crosshair_completed = future_crosshair.result()
+        # Only clean, non-empty runs are worth freezing for a week, a timeout
+        # or error stays uncached so the next run of the same code retries.
+        # repr/literal_eval round-trips the tuples exactly, unlike json
+        if crosshair_completed and Doctests_CrossHair:
+            llm_cache.put(crosshair_key, repr(Doctests_CrossHair))
+    else:
+        Doctests_CrossHair = ast.literal_eval(cached_crosshair)
     print("Crosshair: ", Doctests_CrossHair)
 
     # Was used to test a feature, currently not in use hence just using an empty list inplace
     Doctests_GhostWriter = []
 
-    # Combines all doctests, and removes duplicates.
-    suggested_doctest_inputs = suggested_doctest_inputs_generator(user_doctests, llm_doctests, Doctests_CrossHair, Doctests_GhostWriter)
+    # Combines all doctests, and removes duplicates. The repr set of user
+    # inputs is computed once here and handed down instead of being rebuilt
+    user_inputs_set = {repr(doctest[0]) for doctest in user_doctests}
+    suggested_doctest_inputs = suggested_doctest_inputs_generator(user_doctests, llm_doctests, Doctests_CrossHair, Doctests_GhostWriter, user_inputs_set)
     print("suggested_doctest_inputs:", suggested_doctest_inputs)
 
     # Creation of suggested_doctests list to be shown on the page, this runs the function on the inputs generated to get the outputs
+    tasks.report("Running the suggested doctests")
     suggested_doctests = suggested_doctests_list_generator(suggested_doctest_inputs, function_name, function_code)
     print("suggested_doctests:", suggested_doctests)
 
+    return {
+        "function_name": function_name,
+        "docstring": docstring,
+        "function_signature": function_signature,
+        "user_doctests": user_doctests,
+        "suggested_doctests": suggested_doctests,
+        "function_code": function_code,
+        "return_type": return_type,
+    }
+
+
+@UI.route("/suggestedDoctests", methods=["POST"])
+def show_suggested_doctests():
+    # User provided details for the function stored in function_details, sample dictionary in format/functionDetailsType.txt
+    function_details = dict(request.form)
+
+    # Malformed details are rejected here in microseconds, before they can
+    # cost an LLM round-trip inside the pipeline
+    error_message = validate(function_details)
+    if error_message is not None:
+        return render_template('errorGeneratingFunctionCode.html', error_message = error_message)
+
+    # The heavy pipeline runs on a worker thread so this web worker is free
+    # immediately, the browser shows a pending page that polls for the result
+    task_id = tasks.submit(suggested_doctests_pipeline, function_details)
+    return render_template('pending.html', task_id = task_id)
+
+
+@UI.route("/taskStatus/<task_id>")
+def task_status(task_id):
+    # Polled by the pending page while the background pipeline runs, the phase
+    # lets the page show which stage of the pipeline is currently executing
+    return {"state": tasks.status(task_id), "phase": tasks.progress(task_id)}
+
+
+@UI.route("/suggestedDoctestsResult/<task_id>")
+def show_suggested_doctests_result(task_id):
+    state = tasks.status(task_id)
+
+    if state == "pending":
+        return render_template('pending.html', task_id = task_id)
+
+    if state != "done":
+        return render_template('errorGeneratingFunctionCode.html', error_message = "Seems the generation task crashed or its result expired")
+
+    payload = tasks.result(task_id)
+
+    if "error_message" in payload:
+        return render_template('errorGeneratingFunctionCode.html', error_message = payload["error_message"])
+
+    suggested_doctests = payload["suggested_doctests"]
+
     # If no suggested_doctests, return the generated function_code
     if len(suggested_doctests) == 0:
-        return render_template('yourFunctionCode.html', function_code = function_code)
+        return _function_code_response('yourFunctionCode.html', payload["function_code"])
 
     # Store necessary information in session, so it can be used for other requests/pages
-    session['function_name'] = function_name
-    session['docstring'] = docstring
-    session['function_signature'] = function_signature
-    session['user_doctests'] = user_doctests
+    session['function_name'] = payload["function_name"]
+    session['docstring'] = payload["docstring"]
+    session['function_signature'] = payload["function_signature"]
+    session['user_doctests'] = payload["user_doctests"]
     session['suggested_doctests'] = suggested_doctests
-    session['function_code'] = function_code
-    session['return_type'] = return_type 
+    session['function_code'] = payload["function_code"]
+    session['return_type'] = payload["return_type"]
 
     # Rendering suggested doctests page
     is_tuple = isinstance(suggested_doctests[0][0], tuple)   # Variable to check if input for doctests are tuples or non-tuples
-    return render_template('suggestedDoctests.html', suggested_doctests = suggested_doctests, function_name = function_name, is_tuple = is_tuple)
+    return render_template('suggestedDoctests.html', suggested_doctests = suggested_doctests, function_name = payload["function_name"], is_tuple = is_tuple)
 
 @UI.route("/functionCode", methods=["POST"])
-def get_function_code():
+async def get_function_code():
 
     # User expected outputs for suggested doctests is in doctests_details, a sample is contained in format/doctestDetailsType.txt
     doctests_details = dict(request.form)
@@ -139,15 +283,15 @@ def get_function_code():
 
     # If all doctests are passed, return function_code
     if all_doctests_passed:
-        return render_template('yourFunctionCode.html', function_code = function_code)
+        return _function_code_response('yourFunctionCode.html', function_code)
 
     # Regeneration of function code to pass all doctests
-    function_code = check_syntax_errors(function_signature, docstring, doctests)
+    function_code = await asyncio.to_thread(check_syntax_errors, function_signature, docstring, doctests)
 
     if not function_code:
         return render_template('errorGeneratingFunctionCode.html', error_message = "Seems LLM couldn't generate the function code based on the suggested doctests or the LLM crashed")
 
-    function_code = verified_code_gen(function_name, function_code, doctests)
+    function_code = await asyncio.to_thread(verified_code_gen, function_name, function_code, doctests)
 
     if isinstance(function_code, dict):
         min_value = min(function_code.values())
@@ -158,11 +302,11 @@ def get_function_code():
         )
 
     # Function code generation is done, that is syntax error free and passes all the user doctests and suggested doctests
-    return render_template('yourFunctionCode.html', function_code = function_code)
+    return _function_code_response('yourFunctionCode.html', function_code)
 
 
 @UI.route("/postFinalChoice", methods=["POST"])
-def post_final_choice():
+async def post_final_choice():
     action = request.form.get("action")
 
     if action == "go_back":
@@ -174,16 +318,20 @@ def post_final_choice():
         doctests = session.get('doctests')
         function_name = session.get('function_name')
 
-        llm_doctests = refute_llm_code(function_code, doctests)
+        llm_doctests = await asyncio.to_thread(refute_llm_code, function_code, doctests)
+
+        # Stored so refute_Code can reuse this round-trip instead of repeating the identical call
+        session['llm_doctests'] = llm_doctests
 
         print("llm doctests:", llm_doctests)
 
-        #creation of refuted_doctests list to be shown on the page
-        refuted_doctests = suggested_doctests_list_generator(llm_doctests, function_name, function_code)
+        # Creation of refuted_doctests list to be shown on the page, run off the
+        # event loop since it blocks on the execution pool
+        refuted_doctests = await asyncio.to_thread(suggested_doctests_list_generator, llm_doctests, function_name, function_code)
         print("refuted_doctest:", refuted_doctests)
 
         if len(refuted_doctests) == 0:
-            return render_template('yourFunctionCode.html', function_code = function_code)
+            return _function_code_response('yourFunctionCode.html', function_code)
         
         session['refuted_doctests'] = refuted_doctests
 
@@ -199,7 +347,7 @@ def post_final_choice():
 
 
 @UI.route("/refuteCode", methods=["POST"])
-def refute_Code():
+async def refute_Code():
     function_details = dict(request.form)
 
     function_code = session.get('function_code')
@@ -210,8 +358,11 @@ def refute_Code():
 
     user_doctests = user_refute_doctests_generator(function_details, function_details["number_of_doctests"]) # Doctests with inputs and expected outputs
 
-    llm_doctests = refute_llm_code(function_code, doctests)
-    session['llm_doctests'] = llm_doctests
+    # post_final_choice already made this exact refute call, reuse its result
+    llm_doctests = session.get('llm_doctests')
+    if llm_doctests is None:
+        llm_doctests = await asyncio.to_thread(refute_llm_code, function_code, doctests)
+        session['llm_doctests'] = llm_doctests
     print("llm doctests:", llm_doctests)
 
     refuted_doctest_inputs = refuted_doctest_inputs_generator(doctests, llm_doctests, user_doctests)
@@ -221,8 +372,9 @@ def refute_Code():
 
     session['user_doctests'] = user_doctests
 
-    # Creation of suggested_doctests list to be shown on the page
-    suggested_doctests = suggested_doctests_list_generator(refuted_doctest_inputs, function_name, function_code)
+    # Creation of suggested_doctests list to be shown on the page, run off the
+    # event loop since it blocks on the execution pool
+    suggested_doctests = await asyncio.to_thread(suggested_doctests_list_generator, refuted_doctest_inputs, function_name, function_code)
     print("suggested_doctests:", suggested_doctests)
 
     is_tuple = isinstance(refuted_doctests[0][0], tuple)   # Variable to check if input for doctests are tuples or non-tuples
@@ -231,7 +383,7 @@ def refute_Code():
 
 
 @UI.route("/refuteFunctionCode", methods=["POST"]) 
-def refute_function_code():
+async def refute_function_code():
 
     old_doctests = session.get('doctests')
 
@@ -248,20 +400,20 @@ def refute_function_code():
     doctests, all_doctests_passed = final_doctests(doctests_details, llm_doctests, user_doctests, old_doctests)
 
     if all_doctests_passed:
-        return render_template('yourFinalCode.html', function_code = function_code)
+        return _function_code_response('yourFinalCode.html', function_code)
     
     temp_code = function_code
-    
-    function_code = refute_code_errors(session.get('function_code'), doctests)
+
+    function_code = await asyncio.to_thread(refute_code_errors, temp_code, doctests)
 
     if not function_code:
         return render_template('errorGeneratingFunctionCode.html', error_message = f"Seems LLM couldn't generate the function code based on the suggested doctests or the LLM crashed \n\n\n Function Code: \n f{temp_code}")
 
-    function_code = verified_code_gen(function_name, function_code, doctests) 
+    function_code = await asyncio.to_thread(verified_code_gen, function_name, function_code, doctests)
     if not function_code:
         return render_template('errorGeneratingFunctionCode.html', error_message = f"Seems llm generated code didn't pass all the doctests, or it crashed. \n\n\n Function Code: \n f{temp_code}")
 
-    return render_template('yourFinalCode.html', function_code = function_code)
+    return _function_code_response('yourFinalCode.html', function_code)
 
 
 if __name__ == '__main__':
@@ -10,20 +10,88 @@ It helps us:
 Date: 26 December 2024
 """
 
+import os
+from ast import literal_eval
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 
-def suggested_doctest_inputs_generator(user_doctests: list, llm_doctests: list, crosshair_doctests: list, ghostwriter_doctests: list) -> list:
+# Seconds each candidate execution may take before it is abandoned. The inputs
+# come from LLMs and CrossHair, so a pathological one (infinite loop, huge
+# exponentiation) must not be allowed to hang the web worker.
+_EXECUTION_TIMEOUT = 2
+
+_exec_pool = None
+
+
+@lru_cache(maxsize=128)
+def _compiled_function(function_code: str, function_name: str):
+    """
+    Compiles and executes function_code once per unique source, returning the
+    named function. The suggested/refute flows re-run the same code up to three
+    times per request cycle, so the parse + compile + exec cost is paid once.
+    """
+    namespace = {}
+    exec(compile(function_code, '<doctest>', 'exec'), namespace)
+    return namespace.get(function_name)
+
+
+def _run_one(function_code: str, function_name: str, doctest_input, is_tuple: bool):
+    """
+    Runs one candidate input against the function. Executes inside a pool worker
+    process, so crashes and hangs stay isolated from the web worker. The
+    _compiled_function cache lives per worker and persists across submissions.
+    """
+    function_ref = _compiled_function(function_code, function_name)
+    try:
+        output = function_ref(*doctest_input) if is_tuple else function_ref(doctest_input)
+    except Exception as e:
+        return (doctest_input, f"Error: {str(e)}")
+    return (doctest_input, output)
+
+
+def _execution_pool() -> ProcessPoolExecutor:
+    """Returns the shared worker pool, creating it lazily on first use."""
+    global _exec_pool
+    if _exec_pool is None:
+        _exec_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _exec_pool
+
+
+def _reset_execution_pool():
+    """
+    Discards the pool after a timeout. A worker stuck inside candidate code never
+    frees itself, so the pool is abandoned and a fresh one is created lazily.
+    """
+    global _exec_pool
+    pool = _exec_pool
+    _exec_pool = None
+    if pool is not None:
+        # shutdown() alone would leave the stuck worker spinning (and block
+        # interpreter exit), so the worker processes are killed outright
+        for process in list(pool._processes.values()):
+            process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def suggested_doctest_inputs_generator(user_doctests: list, llm_doctests: list, crosshair_doctests: list, ghostwriter_doctests: list, user_inputs_set=None) -> list:
     """
     Returns a list of suggested doctests with unique entries distinct from the doctests in user doctests.
+    Callers that already hold the repr set of user doctest inputs can pass it as user_inputs_set to skip recomputing it.
     """
-    user_doctest_inputs = [doctest[0] for doctest in user_doctests]
+    # Membership is tracked in a set of reprs (inputs may contain unhashable lists),
+    # so each candidate costs one O(1) lookup instead of scanning both lists
+    seen = set(user_inputs_set) if user_inputs_set is not None else {repr(doctest[0]) for doctest in user_doctests}
     suggested_doctests = []
 
     # We check each source of generated doctests and filter out duplicates
     for doctest_list in (llm_doctests, crosshair_doctests, ghostwriter_doctests):
         for doctest_input in doctest_list:
-            if doctest_input not in user_doctest_inputs and doctest_input not in suggested_doctests:
+            key = repr(doctest_input)
+            if key not in seen:
+                seen.add(key)
                 suggested_doctests.append(doctest_input)
-    
+
     return suggested_doctests
 
 
@@ -32,16 +100,18 @@ def refuted_doctest_inputs_generator(doctests: list, llm_doctests: list, user_do
     Returns a list of suggested doctests with unique entries distinct from the doctests in user doctests.
     """
 
-    
-    # We check both llm_doctests and doctests to find new candidates
-    user_doctest_inputs = [doctest[0] for doctest in user_doctests]
+    # We check both llm_doctests and doctests to find new candidates, with the
+    # same repr-keyed set dedup as suggested_doctest_inputs_generator
+    seen = {repr(doctest[0]) for doctest in user_doctests}
     suggested_doctests = []
-    
+
     for doctest_list in (llm_doctests, doctests):
         for doctest_input in doctest_list:
-            if doctest_input not in user_doctest_inputs and doctest_input not in suggested_doctests:
+            key = repr(doctest_input)
+            if key not in seen:
+                seen.add(key)
                 suggested_doctests.append(doctest_input)
-    
+
     return suggested_doctests
 
 
@@ -51,27 +121,52 @@ def suggested_doctests_list_generator(suggested_doctest_inputs: list, function_n
     """
     if suggested_doctest_inputs == []:
         return []
-    
+
     suggested_doctests =[]
 
-    namespace = {}
-    exec(function_code, namespace)
-    function_ref = namespace.get(function_name)
-
-    if not isinstance(suggested_doctest_inputs[0], tuple):
-        for doctest_input in suggested_doctest_inputs:
-            try:
-                output = function_ref(doctest_input)
-                suggested_doctests.append((doctest_input, output))
-            except Exception as e:
-                suggested_doctests.append((doctest_input, f"Error: {str(e)}"))
-    else:
-        for doctest_input in suggested_doctest_inputs:
-            try:
-                output = function_ref(*doctest_input)
-                suggested_doctests.append((doctest_input, output))
-            except Exception as e:
-                suggested_doctests.append((doctest_input, f"Error: {str(e)}"))
+    is_tuple = isinstance(suggested_doctest_inputs[0], tuple)
+
+    # Collapse duplicate candidates (repr-keyed since inputs may hold lists) so
+    # each distinct input is executed once, keeping first-seen order
+    seen = set()
+    unique_inputs = []
+    for doctest_input in suggested_doctest_inputs:
+        key = repr(doctest_input)
+        if key not in seen:
+            seen.add(key)
+            unique_inputs.append(doctest_input)
+
+    # Every candidate runs in a worker process with a wall-clock timeout,
+    # independent inputs also execute in parallel across the pool
+    try:
+        pool = _execution_pool()
+        futures = [pool.submit(_run_one, function_code, function_name, doctest_input, is_tuple)
+                   for doctest_input in unique_inputs]
+    except BrokenProcessPool:
+        # A previous candidate killed its worker outright, rebuild and retry once
+        _reset_execution_pool()
+        pool = _execution_pool()
+        futures = [pool.submit(_run_one, function_code, function_name, doctest_input, is_tuple)
+                   for doctest_input in unique_inputs]
+
+    timed_out = False
+    pool_broken = False
+    for doctest_input, future in zip(unique_inputs, futures):
+        try:
+            suggested_doctests.append(future.result(timeout=_EXECUTION_TIMEOUT))
+        except FutureTimeoutError:
+            timed_out = True
+            suggested_doctests.append((doctest_input, "Error: timed out"))
+        except BrokenProcessPool:
+            # A candidate killed its worker (os._exit, OOM kill), the pool is
+            # unusable from here on and must be rebuilt like on a timeout
+            pool_broken = True
+            suggested_doctests.append((doctest_input, "Error: crashed"))
+        except Exception as e:
+            suggested_doctests.append((doctest_input, f"Error: {str(e)}"))
+
+    if timed_out or pool_broken:
+        _reset_execution_pool()
 
     return suggested_doctests
     
@@ -83,21 +178,20 @@ def final_doctests_generator(doctests_details: dict, user_doctests: list, sugges
 
     all_doctests_passed = True
     new_doctests = []
-
-    # Go through each suggested doctest and see if the user accepted it
-    for i in range(len(suggested_doctests)):
-        doctest = suggested_doctests[i]
-        if doctests_details[f"confirmation_{i}"] == "accept":
-            if doctest[1] != "Error":
-                new_doctests.append(doctest)
+    details = doctests_details.get
+
+    # Go through each suggested doctest and see if the user accepted it,
+    # reading each form field once instead of re-indexing per branch
+    for i, (doctest_input, doctest_output) in enumerate(suggested_doctests):
+        if details(f"confirmation_{i}") == "accept":
+            if doctest_output != "Error":
+                new_doctests.append((doctest_input, doctest_output))
         else:
             all_doctests_passed = False
-            if doctests_details[f"output_{i}"] != "Error":
-                if return_type == "str":
-                    new_doctests.append((doctest[0], doctests_details[f"output_{i}"]))
-                else:
-                    new_doctests.append((doctest[0], eval(doctests_details[f"output_{i}"])))
-    
+            user_output = details(f"output_{i}")
+            if user_output != "Error":
+                new_doctests.append((doctest_input, user_output if return_type == "str" else literal_eval(user_output)))
+
     return (user_doctests + new_doctests), all_doctests_passed #non-empty
 
 
@@ -106,15 +200,16 @@ def final_doctests(doctests_details, llm_doctests, user_doctests, old_doctests):
 
     all_doctests_passed = True
     new_doctests = []
+    details = doctests_details.get
 
-    for _ in range(len(llm_doctests)):
-        doctest = llm_doctests[_]
-        if doctests_details[f"confirmation_{_}"] == "accept":
-            if doctest[1] != "Error":
-                new_doctests.append(doctest)
+    for i, (doctest_input, doctest_output) in enumerate(llm_doctests):
+        if details(f"confirmation_{i}") == "accept":
+            if doctest_output != "Error":
+                new_doctests.append((doctest_input, doctest_output))
         else:
             all_doctests_passed = False
-            if doctests_details[f"output_{_}"] != "Error":
-                new_doctests.append((doctest[0], doctests_details[f"output_{_}"]))
-    
+            user_output = details(f"output_{i}")
+            if user_output != "Error":
+                new_doctests.append((doctest_input, user_output))
+
     return (new_doctests + user_doctests + old_doctests), all_doctests_passed
\ No newline at end of file
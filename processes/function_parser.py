@@ -12,6 +12,21 @@ transforming user input into verifiable function implementations.
 Date: 22 December 2024
 """
 
+from ast import literal_eval
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1024)
+def _parse(value_str: str):
+    """
+    Parses one user-entered literal like "(1, 2)" or "[1, 2]" into a Python
+    object. literal_eval only accepts literals, so arbitrary expressions in
+    form fields raise instead of executing. Refute cycles resubmit the same
+    strings from session, hence the cache.
+    """
+    return literal_eval(value_str)
+
+
 def function_signature_generator(function_details: dict) -> str:
     """
     Returns the function signature as a string, from the given dictionary function_details.
@@ -45,8 +60,8 @@ def user_doctests_generator(function_details: dict) -> list:
             output_str = function_details[f"output_{i}"]
 
             # Convert string representation to Python objects
-            input_val = eval(input_str)  # Convert "(1, 2)" -> (1, 2) or "[1, 2]" -> [1, 2]
-            output_val = eval(output_str)  # Convert "1" -> 1 or "[1, 2]" -> [1, 2]
+            input_val = _parse(input_str)  # Convert "(1, 2)" -> (1, 2) or "[1, 2]" -> [1, 2]
+            output_val = _parse(output_str)  # Convert "1" -> 1 or "[1, 2]" -> [1, 2]
 
             # Ensure single argument inputs aren't stored as tuples
             doctests.append((input_val, output_val))
@@ -69,12 +84,50 @@ def user_refute_doctests_generator(function_details: dict, num_tests) -> list:
             output_str = function_details[f"output_{i}"]
 
             # Convert string representation to Python objects
-            input_val = eval(input_str)  # Convert "(1, 2)" -> (1, 2) or "[1, 2]" -> [1, 2]
-            output_val = eval(output_str)  # Convert "1" -> 1 or "[1, 2]" -> [1, 2]
+            input_val = _parse(input_str)  # Convert "(1, 2)" -> (1, 2) or "[1, 2]" -> [1, 2]
+            output_val = _parse(output_str)  # Convert "1" -> 1 or "[1, 2]" -> [1, 2]
 
             # Ensure single argument inputs aren't stored as tuples
             doctests.append((input_val, output_val))
 
         return doctests
     except Exception:
-        return []
\ No newline at end of file
+        return []
+
+def validate(function_details: dict) -> str:
+    """
+    Cheap validation of the submitted form before any LLM call is made.
+    Returns an error message describing the first problem found, or None when
+    the details are usable. Catching malformed input here costs microseconds
+    instead of a wasted LLM round-trip on the unhappy path.
+    """
+    if not function_details.get("function_name", "").strip():
+        return "Please provide a function name"
+    if not function_details.get("docstring", "").strip():
+        return "Please provide a docstring"
+
+    try:
+        num_args = int(function_details.get("number_of_arguments", ""))
+        int(function_details.get("number_of_return_types", ""))
+        num_tests = int(function_details.get("number_of_doctests", ""))
+    except ValueError:
+        return "Argument, return type and doctest counts must be whole numbers"
+
+    for i in range(1, num_args + 1):
+        if not function_details.get(f"argument_{i}", "").strip():
+            return f"Argument {i} is missing"
+
+    if not function_details.get("return_1", "").strip():
+        return "Please provide a return type"
+
+    for i in range(1, num_tests + 1):
+        for field, label in ((f"doctest_{i}", "input"), (f"output_{i}", "output")):
+            value = function_details.get(field, "")
+            if not value.strip():
+                return f"Doctest {i} is missing its {label}"
+            try:
+                _parse(value)
+            except Exception:
+                return f"Doctest {i} has an invalid {label}: {value}"
+
+    return None
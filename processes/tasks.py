@@ -0,0 +1,102 @@
+"""
+Module Name: Background Tasks
+Purpose:
+This module provides a minimal in-process task queue for the ARHF tool.
+Heavy pipelines (LLM calls + CrossHair runs) execute on a worker thread while
+the web worker returns immediately, and the UI polls for the result by task id.
+
+It mirrors the submit/poll shape of a Celery deployment without requiring a
+broker, which keeps the tool runnable as a single local process.
+
+Date: 30 August 2026
+"""
+
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Worker pool that runs the submitted pipelines
+_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+
+# Futures by task id, guarded by a lock since Flask workers and the pool touch it
+_TASKS = {}
+_LOCK = threading.Lock()
+
+# Finished tasks whose results were never collected are swept once this many
+# entries accumulate, so abandoned browser tabs cannot leak results forever
+_MAX_TASKS = 128
+
+# Latest phase reported by each running task, shown on the pending page
+_PROGRESS = {}
+
+# Lets report() find the task id of the pipeline running on the current thread
+_current = threading.local()
+
+
+def _run(task_id, func, args, kwargs):
+    """Runs func on the pool with its task id bound to the worker thread."""
+    _current.task_id = task_id
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _current.task_id = None
+
+
+def submit(func, *args, **kwargs) -> str:
+    """
+    Schedules func(*args, **kwargs) on the worker pool and returns a task id.
+    """
+    task_id = uuid.uuid4().hex
+    future = _EXECUTOR.submit(_run, task_id, func, args, kwargs)
+    with _LOCK:
+        if len(_TASKS) >= _MAX_TASKS:
+            for old_id in [tid for tid, fut in _TASKS.items() if fut.done()]:
+                del _TASKS[old_id]
+                _PROGRESS.pop(old_id, None)
+        _TASKS[task_id] = future
+    return task_id
+
+
+def report(phase: str) -> None:
+    """
+    Records the phase the calling task is in, e.g. "Generating function code".
+    Called from inside a submitted function; a no-op anywhere else, so the
+    pipeline functions stay directly callable in tests and scripts.
+    """
+    task_id = getattr(_current, "task_id", None)
+    if task_id is not None:
+        with _LOCK:
+            _PROGRESS[task_id] = phase
+
+
+def progress(task_id: str) -> str:
+    """
+    Returns the last phase reported by a task, or "" if none was reported.
+    """
+    with _LOCK:
+        return _PROGRESS.get(task_id, "")
+
+
+def status(task_id: str) -> str:
+    """
+    Returns the state of a task: "pending", "done", "failed" or "unknown".
+    """
+    with _LOCK:
+        future = _TASKS.get(task_id)
+    if future is None:
+        return "unknown"
+    if not future.done():
+        return "pending"
+    return "failed" if future.exception() is not None else "done"
+
+
+def result(task_id: str):
+    """
+    Returns the result of a finished task. Must only be called once
+    status(task_id) reports "done". The task stays in the registry so
+    refreshing or navigating back to a result page keeps working; finished
+    entries are reclaimed by the sweep in submit().
+    """
+    with _LOCK:
+        future = _TASKS[task_id]
+    return future.result()
@@ -0,0 +1,25 @@
+document.addEventListener("DOMContentLoaded", function () {
+    const taskId = document.body.dataset.taskId;
+
+    // Poll the task status once a second, and move to the result page as soon
+    // as the background pipeline has finished (the result page also handles
+    // the failure states). The reported phase is shown so users see progress
+    // instead of a bare spinner.
+    function poll() {
+        fetch(`/taskStatus/${taskId}`)
+            .then(response => response.json())
+            .then(data => {
+                if (data.state === "pending") {
+                    if (data.phase) {
+                        document.getElementById("pendingPhase").textContent = data.phase;
+                    }
+                    setTimeout(poll, 1000);
+                } else {
+                    window.location.href = `/suggestedDoctestsResult/${taskId}`;
+                }
+            })
+            .catch(error => console.error("Error:", error));
+    }
+
+    poll();
+});